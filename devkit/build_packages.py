@@ -2,19 +2,32 @@
 
 import os
 import re
+import io
+import mmap
 import subprocess
 import hashlib
+import ssl
 import pathlib
+import shutil
+import tarfile
 import gzip
 import bz2
 import lzma
 import yaml
 import zstandard as zstd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from colorama import init, Fore, Style
+from hashing import HASH_ALGORITHMS, get_file_hashes, load_hash_cache, save_hash_cache, save_packages_hashes
 
 # 初始化 colorama
 init(autoreset=True)
 
+# 优先使用 libyaml 提供的 C 实现解析 YAML
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # 检查是否使用 sparse-checkout 模式
 SPARSE_CHECKOUT = os.getenv('SPARSE_CHECKOUT', 'false').lower() == 'true'
 
@@ -24,7 +37,7 @@ havoc_ids = {}
 hidden_packages = []
 package_title_mappings = {}
 with open('index.yaml', 'r', encoding='utf-8') as file:
-    data = yaml.safe_load(file)
+    data = yaml.load(file, Loader=YamlLoader)
     BASE_URL = data['base-url']
     havoc_ids = data['havoc-mappings']
     hidden_packages = data['hidden-packages']
@@ -35,42 +48,50 @@ with open('index.yaml', 'r', encoding='utf-8') as file:
 icon_mappings = {}
 try:
     with open('icons/index.yaml', 'r', encoding='utf-8') as file:
-        icon_mappings = yaml.safe_load(file)
+        icon_mappings = yaml.load(file, Loader=YamlLoader)
 except FileNotFoundError:
     pass
 
 
-def get_file_hashes(file_path):
-    hashes = {}
-    with open(file_path, 'rb') as f:
-        contents = f.read()
-        hashes['MD5sum'] = hashlib.md5(contents).hexdigest()
-        hashes['SHA1'] = hashlib.sha1(contents).hexdigest()
-        hashes['SHA256'] = hashlib.sha256(contents).hexdigest()
-        hashes['SHA512'] = hashlib.sha512(contents).hexdigest()
-    return hashes
+COMPRESS_BLOCK_SIZE = 1 << 20
+PACKAGES_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def print_hash_backend():
+    """打印哈希计算所用的 OpenSSL 版本及 CPU 的 SHA 指令集支持情况"""
+    # 无法读取 CPU 标志（如 macOS、BSD 没有 /proc/cpuinfo）时报告 unknown，
+    # 只有确实读到标志且其中没有 SHA 扩展时才报告 none detected
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            cpu_flags = next((line.split(':', 1)[1].split()
+                              for line in f if line.startswith(('flags', 'Features'))), None)
+    except OSError:
+        cpu_flags = None
+    if cpu_flags is None:
+        sha_support = 'unknown'
+    else:
+        sha_extensions = [flag for flag in ('sha_ni', 'sha1', 'sha2', 'sha512') if flag in cpu_flags]
+        sha_support = ', '.join(sha_extensions) or 'none detected'
+    print(Style.DIM + f"Hash backend: {ssl.OPENSSL_VERSION}, CPU SHA extensions: {sha_support}")
 
 
 def get_changed_deb_files():
     """获取此次提交新增或已修改的 deb 文件"""
     try:
-        # 获取已暂存的新增或修改文件
-        result = subprocess.run(['git', 'diff', '--cached', '--name-only', '--diff-filter=AM', '--', 'downloads/'],
-                               capture_output=True, text=True, check=True)
-        staged_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-
-        # 获取工作区已修改的跟踪文件
-        result = subprocess.run(['git', 'diff', '--name-only', '--diff-filter=M', '--', 'downloads/'],
-                               capture_output=True, text=True, check=True)
-        modified_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-
-        # 获取工作区新增的文件
-        result = subprocess.run(['git', 'ls-files', '--others', '--exclude-standard'], 
-                               capture_output=True, text=True, check=True)
-        untracked_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-
-        # 合并并过滤 deb 文件
-        changed_files = staged_files + modified_files + untracked_files
+        # 一次 git status 同时获取已暂存的新增或修改文件、工作区已修改的跟踪文件和新增的文件
+        # 使用 -z 输出以 NUL 分隔的原始路径，无需转义和逐行解析
+        result = subprocess.run(['git', 'status', '--porcelain=v1', '-z', '--no-renames',
+                                 '--untracked-files=all', '--', 'downloads/'],
+                                capture_output=True, check=True)
+        changed_files = []
+        for entry in result.stdout.split(b'\0'):
+            if len(entry) < 4:
+                continue
+            index_status, worktree_status = entry[0:1], entry[1:2]
+            if index_status in (b'A', b'M') or worktree_status == b'M' or entry[:2] == b'??':
+                changed_files.append(os.fsdecode(entry[3:]))
+
+        # 过滤 deb 文件
         deb_files = sorted({
             f for f in changed_files
             if f.endswith('.deb') and f.startswith('downloads/')
@@ -86,130 +107,208 @@ def get_changed_deb_files():
         return []
 
 
+# 匹配 Packages 文件中需要的字段
+PACKAGES_HEADER_RE = re.compile(rb'^(Package|Version|Architecture|Filename): (.+)$', re.MULTILINE)
+
+
 def parse_existing_packages(packages_file):
     """解析现有的 Packages 文件，返回包信息字典"""
     packages = {}
     if not os.path.exists(packages_file):
         return packages
-        
-    with open(packages_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 分割每个包的信息
-    package_blocks = content.split('\n\n')
-    for block in package_blocks:
-        if not block.strip():
-            continue
-            
-        lines = block.strip().split('\n')
-        package_info = {}
-        package_name = None
-        version = None
-        architecture = None
-        filename = None
-        
-        for line in lines:
-            if ': ' in line:
-                key, value = line.split(': ', 1)
-                package_info[key] = value
-                if key == 'Package':
-                    package_name = value
-                elif key == 'Version':
-                    version = value
-                elif key == 'Architecture':
-                    architecture = value
-                elif key == 'Filename':
-                    filename = value
-        
+
+    with open(packages_file, 'rb') as f:
+        data = f.read()
+
+    # 逐个定位包信息块，只在块内用预编译的正则提取字段
+    position = 0
+    data_length = len(data)
+    while position < data_length:
+        # 跳过块之间的空行
+        while position < data_length and data[position] == 0x0A:
+            position += 1
+        if position >= data_length:
+            break
+        block_end = data.find(b'\n\n', position)
+        if block_end < 0:
+            block_end = data_length
+
+        fields = {
+            match.group(1): match.group(2).decode('utf-8')
+            for match in PACKAGES_HEADER_RE.finditer(data, position, block_end)
+        }
+        block_start = position
+        position = block_end
+
+        package_name = fields.get(b'Package')
+        version = fields.get(b'Version')
+        architecture = fields.get(b'Architecture')
         if package_name and version and architecture:
             # 使用 Package + Version + Architecture 作为唯一标识
             package_key = f"{package_name}_{version}_{architecture}"
             packages[package_key] = {
-                'info': package_info,
-                'block': block,
-                'filename': filename,
+                'block': data[block_start:block_end].rstrip(b'\n') + b'\n',
+                'filename': fields.get(b'Filename'),
                 'package_name': package_name,
                 'version': version,
                 'architecture': architecture
             }
-    
+
     return packages
 
 
-def process_single_deb_file(deb_path):
-    """处理单个 deb 文件，返回包信息字符串和包标识"""
+# 匹配 control 文件中的字段
+CONTROL_PACKAGE_RE = re.compile(rb'^Package: (.+)$', re.MULTILINE)
+CONTROL_VERSION_RE = re.compile(rb'^Version: (.+)$', re.MULTILINE)
+CONTROL_ARCHITECTURE_RE = re.compile(rb'^Architecture: (.+)$', re.MULTILINE)
+CONTROL_NAME_RE = re.compile(rb'^Name: .+$', re.MULTILINE)
+
+
+def extract_control_member(member_name, member_data):
+    """从 control.tar.* 成员中解压出 control 文件"""
+    if member_name.endswith(b'.zst'):
+        member_data = zstd.ZstdDecompressor().decompressobj().decompress(member_data)
+    with tarfile.open(fileobj=io.BytesIO(member_data), mode='r:*') as tar:
+        for tar_member in tar:
+            if tar_member.name in ('./control', 'control') and tar_member.isfile():
+                return tar.extractfile(tar_member).read()
+    raise KeyError(f"control not found in {member_name.decode()}")
+
+
+def read_deb_control(deb_path):
+    """直接解析 deb 的 ar 归档读取 control 文件，无法解析时回退到 dpkg-deb"""
+    try:
+        with open(deb_path, 'rb') as f:
+            if f.read(8) != b'!<arch>\n':
+                raise ValueError("not an ar archive")
+            while len(header := f.read(60)) == 60:
+                member_name = header[:16].rstrip(b' ').rstrip(b'/')
+                member_size = int(header[48:58])
+                if member_name.startswith(b'control.tar'):
+                    return extract_control_member(member_name, f.read(member_size))
+                # ar 成员按 2 字节对齐
+                f.seek(member_size + (member_size & 1), os.SEEK_CUR)
+        raise KeyError("control.tar not found")
+    except (ValueError, KeyError, tarfile.TarError, zstd.ZstdError) as e:
+        print(Style.DIM + Fore.YELLOW + f"Falling back to dpkg-deb for {deb_path}: {e}")
+
+    result = subprocess.run(['dpkg-deb', '-f', deb_path], capture_output=True, check=True)
+    return result.stdout
+
+
+def process_single_deb_file(deb_path, deb_size, hashes=None):
+    """处理单个 deb 文件，返回包信息字节串、包标识和文件哈希"""
     print(Fore.CYAN + f"Processing {deb_path}...")
 
-    # 获取 dpkg-deb 输出
-    result = subprocess.run(
-        ['dpkg-deb', '-f', deb_path], capture_output=True, text=True, check=True)
-    control_content = result.stdout
+    # 获取 control 文件内容
+    control_content = read_deb_control(deb_path)
 
     # 提取包基本信息
-    package_name = re.search(r"^Package: (.+)$", control_content, re.MULTILINE)
-    version = re.search(r"^Version: (.+)$", control_content, re.MULTILINE)
-    architecture = re.search(r"^Architecture: (.+)$", control_content, re.MULTILINE)
-    
+    package_name = CONTROL_PACKAGE_RE.search(control_content)
+    version = CONTROL_VERSION_RE.search(control_content)
+    architecture = CONTROL_ARCHITECTURE_RE.search(control_content)
+
     if not package_name:
         print(Fore.RED + f"Package name not found in control file of {deb_path}")
-        return None, None, None
-    
-    package_name = package_name.group(1)
-    version = version.group(1) if version else "unknown"
-    architecture = architecture.group(1) if architecture else "unknown"
+        return None, None, None, None
     
+    package_name = package_name.group(1).decode('utf-8')
+    version = version.group(1).decode('utf-8') if version else "unknown"
+    architecture = architecture.group(1).decode('utf-8') if architecture else "unknown"
+
     # 生成唯一标识
     package_key = f"{package_name}_{version}_{architecture}"
 
     # 预处理名称
     if package_name in package_title_mappings:
-        control_content = re.sub(
-            r"^Name: .+$", f"Name: {package_title_mappings[package_name]}",
-            control_content, flags=re.MULTILINE)
+        name_line = f"Name: {package_title_mappings[package_name]}".encode('utf-8')
+        control_content = CONTROL_NAME_RE.sub(lambda _: name_line, control_content)
     if package_name in hidden_packages:
         print(Style.DIM + Fore.YELLOW + f"Package {package_name} is hidden")
-        return None, None, None
+        return None, None, None, None
 
-    # 构建完整的包信息
-    package_info = control_content
+    # 构建完整的包信息，保证以单个换行符结尾
+    package_info = [control_content.rstrip(b'\n'), b'\n']
 
     # 添加 Havoc ID 和图标字段
     havoc_id = havoc_ids.get(package_name, None)
     if havoc_id:
         print(Style.DIM + f"Package: {package_name}, Version: {version}, Architecture: {architecture}, Havoc ID: {havoc_id}")
-        package_info += f"Depiction: https://havoc.app/depiction/{havoc_id}\n"
-        package_info += f"SileoDepiction: https://havoc.app/package/{havoc_id}/depiction.json\n"
+        package_info.append(f"Depiction: https://havoc.app/depiction/{havoc_id}\n".encode('utf-8'))
+        package_info.append(f"SileoDepiction: https://havoc.app/package/{havoc_id}/depiction.json\n".encode('utf-8'))
         icon_name = icon_mappings.get(package_name, None)
         if BASE_URL and icon_name:
-            package_info += f"Icon: {BASE_URL}/icons/{icon_name}\n"
+            package_info.append(f"Icon: {BASE_URL}/icons/{icon_name}\n".encode('utf-8'))
     else:
         print(Style.DIM + f"Package: {package_name}, Version: {version}, Architecture: {architecture}")
 
     # 添加 Filename 和 Size 字段
-    package_info += f"Filename: {deb_path}\n"
-    package_info += f"Size: {os.path.getsize(deb_path)}\n"
+    package_info.append(f"Filename: {deb_path}\nSize: {deb_size}\n".encode('utf-8'))
 
     # 计算并添加文件哈希
-    hashes = get_file_hashes(deb_path)
-    for hash_name, hash_value in hashes.items():
-        package_info += f"{hash_name}: {hash_value}\n"
+    if hashes is None:
+        hashes = get_file_hashes(deb_path)
+    for hash_name, _ in HASH_ALGORITHMS:
+        package_info.append(f"{hash_name}: {hashes[hash_name]}\n".encode('ascii'))
+
+    return package_key, b''.join(package_info), deb_path, hashes
 
-    return package_key, package_info, deb_path
+
+def process_deb_files(deb_entries):
+    """使用多进程并行处理 deb 文件，结果按输入顺序返回；未变化的文件复用缓存的哈希
+
+    deb_entries 为 (文件路径, os.stat_result) 列表，避免重复获取文件信息
+    """
+    if not deb_entries:
+        return []
+
+    hash_cache = load_hash_cache()
+    deb_paths = [deb_path for deb_path, _ in deb_entries]
+    deb_sizes = [stat_result.st_size for _, stat_result in deb_entries]
+    stat_keys = []
+    cached_hashes = []
+    for deb_path, stat_result in deb_entries:
+        stat_key = {'mtime_ns': stat_result.st_mtime_ns, 'size': stat_result.st_size}
+        entry = hash_cache.get(deb_path)
+        stat_keys.append(stat_key)
+        if entry and all(entry.get(k) == v for k, v in stat_key.items()):
+            cached_hashes.append(entry['hashes'])
+        else:
+            cached_hashes.append(None)
+
+    hits = sum(hashes is not None for hashes in cached_hashes)
+    if hits:
+        print(Style.DIM + f"Reusing cached hashes for {hits} of {len(deb_paths)} deb files")
+
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(process_single_deb_file, deb_paths, deb_sizes, cached_hashes))
+
+    dirty = False
+    for (_, _, deb_path, hashes), stat_key, cached in zip(results, stat_keys, cached_hashes):
+        if hashes is not None and cached is None:
+            hash_cache[deb_path] = {**stat_key, 'hashes': hashes}
+            dirty = True
+    if dirty:
+        save_hash_cache(hash_cache)
+
+    return [result[:3] for result in results]
 
 
 def generate_packages_file(deb_directory, output_file):
     """在正常模式下生成完整的 Packages 文件"""
-    with open(output_file, 'w', encoding='utf-8') as packages_file:
-        for deb_file in sorted(os.listdir(deb_directory)):
-            if not deb_file.endswith('.deb'):
-                continue
+    # os.scandir 一次遍历即可获得文件路径和文件信息
+    with os.scandir(deb_directory) as it:
+        deb_entries = [
+            (entry.path, entry.stat())
+            for entry in sorted(it, key=lambda entry: entry.name)
+            if entry.name.endswith('.deb')
+        ]
+    results = process_deb_files(deb_entries)
 
-            deb_path = os.path.join(deb_directory, deb_file)
-            package_key, package_info, _ = process_single_deb_file(deb_path)
-            
-            if package_key and package_info:
-                packages_file.write(package_info)
-                packages_file.write('\n')
+    with open(output_file, 'wb', buffering=PACKAGES_WRITE_BUFFER_SIZE) as packages_file:
+        packages_file.writelines(
+            package_info + b'\n' for package_key, package_info, _ in results
+            if package_key and package_info)
 
 
 def merge_packages_file(output_file):
@@ -228,18 +327,23 @@ def merge_packages_file(output_file):
     new_packages = {}
     updated_filenames = set()  # 记录所有新处理的文件名
 
+    # 确保文件存在
+    deb_entries = []
     for deb_file in changed_deb_files:
-        if os.path.exists(deb_file):  # 确保文件存在
-            package_key, package_info, filename = process_single_deb_file(deb_file)
-            if package_key and package_info:
-                new_packages[package_key] = package_info
-                updated_filenames.add(filename)
-                
-                # 检查是否是更新现有包
-                if package_key in existing_packages:
-                    print(Fore.YELLOW + f"Updating existing package: {package_key}")
-                else:
-                    print(Fore.GREEN + f"Adding new package: {package_key}")
+        try:
+            deb_entries.append((deb_file, os.stat(deb_file)))
+        except FileNotFoundError:
+            continue
+    for package_key, package_info, filename in process_deb_files(deb_entries):
+        if package_key and package_info:
+            new_packages[package_key] = package_info
+            updated_filenames.add(filename)
+
+            # 检查是否是更新现有包
+            if package_key in existing_packages:
+                print(Fore.YELLOW + f"Updating existing package: {package_key}")
+            else:
+                print(Fore.GREEN + f"Adding new package: {package_key}")
     
     # 合并包信息
     all_packages = {}
@@ -256,32 +360,131 @@ def merge_packages_file(output_file):
         all_packages[package_key] = package_info
     
     # 按包名+版本+架构排序并写入文件
-    with open(output_file, 'w', encoding='utf-8') as packages_file:
-        for package_key in sorted(all_packages.keys()):
-            packages_file.write(all_packages[package_key])
-            if not all_packages[package_key].endswith('\n'):
-                packages_file.write('\n')
-            packages_file.write('\n')
+    # 每个包信息都以单个换行符结尾，直接追加空行分隔
+    with open(output_file, 'wb', buffering=PACKAGES_WRITE_BUFFER_SIZE) as packages_file:
+        packages_file.writelines(
+            all_packages[package_key] + b'\n' for package_key in sorted(all_packages))
     
     print(Fore.GREEN + f"Updated {len(new_packages)} package entries in Packages file")
     print(Fore.CYAN + f"Total package entries: {len(all_packages)}")
 
 
-def compress_file(input_file, output_file, compress_func, mode):
-    with open(input_file, 'rb') as f_in:
-        with compress_func(output_file, mode) as f_out:
-            f_out.write(f_in.read())
+class HashingWriter:
+    """包装输出文件，写入的同时统计大小并计算哈希"""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.name = fp.name
+        self.hash_objs = {algorithm: hashlib.new(algorithm) for _, algorithm in HASH_ALGORITHMS}
+
+    def write(self, data):
+        self.fp.write(data)
+        for hash_obj in self.hash_objs.values():
+            hash_obj.update(data)
+        return len(data)
+
+    def flush(self):
+        self.fp.flush()
+
+    def hexdigests(self):
+        return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in self.hash_objs.items()}
 
 
-def compress_zst(input_file, output_file):
-    cctx = zstd.ZstdCompressor()
-    with open(input_file, 'rb') as f_in, open(output_file, 'wb') as f_out:
-        f_out.write(cctx.compress(f_in.read()))
+def iter_blocks(source):
+    """将内存中的数据按块切分为 memoryview，不产生拷贝"""
+    # 每个块用完后立即释放，避免残留的 memoryview 导致 mmap 无法关闭
+    with memoryview(source) as view:
+        for offset in range(0, len(view), COMPRESS_BLOCK_SIZE):
+            with view[offset:offset + COMPRESS_BLOCK_SIZE] as block:
+                yield block
+
+
+def compress_file(source, output_file, compress_func, mode):
+    with open(output_file, 'wb') as f_raw:
+        f_hash = HashingWriter(f_raw)
+        with compress_func(f_hash, mode) as f_out:
+            for block in iter_blocks(source):
+                f_out.write(block)
+    return f_hash.hexdigests()
+
+
+def compress_zst(source, output_file):
+    cctx = zstd.ZstdCompressor(level=19, threads=-1)
+    with open(output_file, 'wb') as f_out:
+        f_hash = HashingWriter(f_out)
+        with cctx.stream_writer(f_hash, size=len(source), closefd=False) as writer:
+            for block in iter_blocks(source):
+                writer.write(block)
+    return f_hash.hexdigests()
+
+
+def compress_native(command, input_file, output_file):
+    """使用原生压缩工具压缩文件，压缩结果从标准输出读取并写入目标文件"""
+    with open(output_file, 'wb') as f_out:
+        f_hash = HashingWriter(f_out)
+        with subprocess.Popen([*command, '-c', str(input_file)], stdout=subprocess.PIPE) as process:
+            shutil.copyfileobj(process.stdout, f_hash, COMPRESS_BLOCK_SIZE)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+    return f_hash.hexdigests()
+
+
+def compress_packages_file(input_file):
+    """并行生成各种格式的压缩文件，优先使用多线程的原生压缩工具
+
+    压缩时顺带计算各文件的哈希并写入 PACKAGES_HASHES_FILE，供 build_release.py 直接使用。
+    Packages 文件只映射到内存一次，哈希计算和 Python 压缩器共享同一份数据；
+    zlib、bz2、lzma 和 zstd 在压缩时都会释放 GIL，因此多线程可以真正并行。
+    """
+    with open(input_file, 'rb') as f_in:
+        # 空文件无法映射
+        source = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f_in.fileno()).st_size else b''
+
+    jobs = [
+        ('Packages.gz', ['pigz', '-9'],
+         lambda: compress_file(source, 'Packages.gz', gzip.open, 'wb')),
+        ('Packages.bz2', ['pbzip2', '-9'],
+         lambda: compress_file(source, 'Packages.bz2', bz2.open, 'wb')),
+        ('Packages.xz', ['xz', '-T0'],
+         lambda: compress_file(source, 'Packages.xz', lzma.open, 'wb')),
+        ('Packages.zst', ['zstd', '-T0', '-19', '-q'],
+         lambda: compress_zst(source, 'Packages.zst')),
+    ]
+
+    def run_job(output_file, command, fallback):
+        if shutil.which(command[0]):
+            return compress_native(command, input_file, output_file)
+        return fallback()
+
+    def hash_input():
+        hash_objs = {algorithm: hashlib.new(algorithm) for _, algorithm in HASH_ALGORITHMS}
+        for block in iter_blocks(source):
+            for hash_obj in hash_objs.values():
+                hash_obj.update(block)
+        return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hash_objs.items()}
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(jobs) + 1) as executor:
+            futures = {str(input_file): executor.submit(hash_input)}
+            for output_file, command, fallback in jobs:
+                futures[output_file] = executor.submit(run_job, output_file, command, fallback)
+            file_hashes = {file_path: future.result() for file_path, future in futures.items()}
+    finally:
+        if isinstance(source, mmap.mmap):
+            try:
+                source.close()
+            except BufferError:
+                # 压缩任务出错时，异常回溯中可能仍持有数据块的 memoryview，
+                # 此时交给垃圾回收释放映射，以免掩盖原本的异常
+                pass
+
+    save_packages_hashes(file_hashes)
 
 
 def main():
     deb_directory = 'downloads'
     output_file = pathlib.Path('Packages')
+    print_hash_backend()
     
     if SPARSE_CHECKOUT:
         print(Fore.CYAN + "Running in sparse-checkout mode")
@@ -293,10 +496,7 @@ def main():
     print(Fore.GREEN + f"Packages file updated at {output_file}")
 
     # 压缩 Packages 文件
-    compress_file(output_file, 'Packages.gz', gzip.open, 'wb')
-    compress_file(output_file, 'Packages.bz2', bz2.open, 'wb')
-    compress_file(output_file, 'Packages.xz', lzma.open, 'wb')
-    compress_zst(output_file, 'Packages.zst')
+    compress_packages_file(output_file)
     print(Fore.GREEN + "Packages file compressed into gz, bz2, xz and zst formats.")
 
 
@@ -1,21 +1,30 @@
 #!/usr/bin/env python3
 
 import os
-import hashlib
 import pathlib
 from datetime import datetime, timezone
 from colorama import init, Fore
+import hashing
 
 # 初始化 colorama
 init(autoreset=True)
 
 
-def calculate_hash(file_path, hash_type):
-    hash_func = getattr(hashlib, hash_type)()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_func.update(chunk)
-    return hash_func.hexdigest()
+HASH_ALGORITHMS = [
+    ('MD5Sum', 'md5'),
+    ('SHA1', 'sha1'),
+    ('SHA256', 'sha256'),
+    ('SHA512', 'sha512'),
+]
+
+def get_file_hashes(file_path, packages_hashes):
+    """优先使用已记录的哈希，文件修改时间或大小不一致时重新计算"""
+    stat_result = os.stat(file_path)
+    recorded = hashing.get_recorded_hashes(packages_hashes, file_path, stat_result)
+    if recorded:
+        return stat_result.st_size, {name: recorded[algorithm]
+                                     for name, algorithm in HASH_ALGORITHMS}
+    return stat_result.st_size, hashing.get_file_hashes(file_path, HASH_ALGORITHMS)
 
 
 def generate_release_file(packages_files, output_file):
@@ -32,33 +41,18 @@ def generate_release_file(packages_files, output_file):
         release_file.write(f"Date: {datetime.now(
             timezone.utc).strftime('%a, %d %b %Y %H:%M:%S +0000')}\n")
 
-        release_file.write("MD5Sum:\n")
+        # 每个文件最多读取一次，已由 build_packages.py 记录的哈希直接复用
+        packages_hashes = hashing.load_packages_hashes()
+        file_entries = []
         for file_path in packages_files:
-            file_size = os.path.getsize(file_path)
+            file_size, hashes = get_file_hashes(file_path, packages_hashes)
             relative_path = pathlib.Path(file_path).name
-            md5sum = calculate_hash(file_path, 'md5')
-            release_file.write(f" {md5sum} {file_size} {relative_path}\n")
+            file_entries.append((relative_path, file_size, hashes))
 
-        release_file.write("SHA1:\n")
-        for file_path in packages_files:
-            file_size = os.path.getsize(file_path)
-            relative_path = pathlib.Path(file_path).name
-            sha1sum = calculate_hash(file_path, 'sha1')
-            release_file.write(f" {sha1sum} {file_size} {relative_path}\n")
-
-        release_file.write("SHA256:\n")
-        for file_path in packages_files:
-            file_size = os.path.getsize(file_path)
-            relative_path = pathlib.Path(file_path).name
-            sha256sum = calculate_hash(file_path, 'sha256')
-            release_file.write(f" {sha256sum} {file_size} {relative_path}\n")
-
-        release_file.write("SHA512:\n")
-        for file_path in packages_files:
-            file_size = os.path.getsize(file_path)
-            relative_path = pathlib.Path(file_path).name
-            sha512sum = calculate_hash(file_path, 'sha512')
-            release_file.write(f" {sha512sum} {file_size} {relative_path}\n")
+        for hash_name, _ in HASH_ALGORITHMS:
+            release_file.write(f"{hash_name}:\n")
+            for relative_path, file_size, hashes in file_entries:
+                release_file.write(f" {hashes[hash_name]} {file_size} {relative_path}\n")
 
 
 def main():
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sys
+import time
+import threading
+import collections
+import multiprocessing
+from urllib.parse import urlparse
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import requests
 import yaml
 from colorama import init, Fore, Style
+from hashing import get_file_hashes, load_hash_cache, save_hash_cache, load_json, save_json_atomic
+from http_session import create_session
 
 # 初始化 colorama
 init(autoreset=True)
 
+# 优先使用 libyaml 提供的 C 实现解析 YAML
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # 从环境变量中读取 GitHub 个人访问令牌
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 if not GITHUB_TOKEN:
@@ -19,7 +33,27 @@ if not GITHUB_TOKEN:
 # 检查是否使用 sparse-checkout 模式
 SPARSE_CHECKOUT = os.getenv('SPARSE_CHECKOUT', 'false').lower() == 'true'
 GITHUB_RELEASES_PER_PAGE = 20
+# 每个仓库最多获取的 release 列表页数，默认只看最近的一页
+GITHUB_RELEASES_MAX_PAGES = int(os.getenv('GITHUB_RELEASES_MAX_PAGES', '1'))
 GITHUB_RELEASE_FETCH_WORKERS = 4
+# 并行下载 deb 文件的线程数
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '8'))
+# 同一主机同时等待响应头的最大请求数，避免集中发起请求触发 GitHub 或 Havoc 的限流；
+# 响应头返回后即释放，不限制同时进行的响应体传输
+HOST_CONCURRENCY = int(os.getenv('HOST_CONCURRENCY', '4'))
+
+# 所有请求共用一个会话，复用 keep-alive 连接，避免每个请求重新进行 TCP/TLS 握手
+# GitHub 令牌只在访问 API 时单独附加，不放入会话的默认请求头
+SESSION = create_session()
+
+_host_semaphores = collections.defaultdict(lambda: threading.BoundedSemaphore(HOST_CONCURRENCY))
+_host_semaphores_lock = threading.Lock()
+
+
+def host_semaphore(url):
+    """返回限制该 URL 所在主机并发请求数的信号量"""
+    with _host_semaphores_lock:
+        return _host_semaphores[urlparse(url).netloc]
 
 # 缓存从 Packages 文件中读取的文件大小信息
 _packages_file_sizes_cache = None
@@ -27,6 +61,83 @@ _packages_file_sizes_cache = None
 # 缓存从 git 中读取的文件存在性信息
 _git_file_exists_cache = None
 
+# 由以上两个缓存合并得到的 {路径: 大小} 映射，_MISSING 表示文件不在 git 中
+_git_packages_sizes_cache = None
+_git_packages_sizes_lock = threading.Lock()
+_MISSING = object()
+
+# 以上两个缓存在磁盘上的副本，分别以 Packages 文件和 git 索引文件的修改时间和大小作为键
+DIST_CACHE_FILE = '.cache/collect_dists.json'
+GIT_INDEX_FILE = '.git/index'
+
+# GitHub release 列表缓存目录，每个仓库一个文件，以请求 URL 为键保存 ETag 和响应内容
+RELEASE_CACHE_DIR = '.cache/gh'
+
+# 未完成下载的 ETag，断点续传时通过 If-Range 确认服务器上的文件没有变化
+ETAG_CACHE_FILE = '.cache/download-etags.json'
+_download_etags_cache = None
+_download_etags_lock = threading.Lock()
+
+# 快速路径使用的正则：Packages 文件中紧邻的 Filename 和 Size 字段
+PACKAGES_DEB_SIZE_RE = re.compile(rb'\nFilename: ([^\s]+\.deb)\nSize: (\d+)\n')
+
+def load_dist_cache():
+    """读取磁盘上的 Packages 大小和 git 文件列表缓存"""
+    return load_json(DIST_CACHE_FILE)
+
+
+def update_dist_cache(section, value):
+    """更新磁盘缓存中的一项，并原子地写回"""
+    dist_cache = load_dist_cache()
+    dist_cache[section] = value
+    os.makedirs(os.path.dirname(DIST_CACHE_FILE), exist_ok=True)
+    save_json_atomic(DIST_CACHE_FILE, dist_cache)
+
+
+def parse_packages_sizes_fast(packages_file):
+    """用一个正则在整个文件上匹配紧邻的 Filename 和 Size 字段
+
+    build_packages.py 生成的 Packages 文件中 Size 总是紧跟在 Filename 之后；
+    如果有 Filename 行没有被匹配到，说明字段顺序不同，返回 None 交给逐行解析处理。
+    """
+    # 在开头补一个换行符，使第一个字段也能以 b'\nFilename: ' 匹配；
+    # 不使用 ^ 和 re.MULTILINE，正则引擎可以直接按字面前缀快速查找
+    with open(packages_file, 'rb') as f:
+        data = b'\n' + f.read()
+    sizes = {
+        filename.decode('utf-8'): int(size)
+        for filename, size in PACKAGES_DEB_SIZE_RE.findall(data)
+    }
+    if len(sizes) != data.count(b'\nFilename: '):
+        return None
+    return sizes
+
+
+def parse_packages_sizes(packages_file):
+    """逐行流式解析，只保留每个包信息块中的 Filename 和 Size 字段"""
+    sizes = {}
+    filename = None
+    size = None
+    with open(packages_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line == '\n':
+                if filename and size is not None and filename.endswith('.deb'):
+                    sizes[filename] = size
+                filename = None
+                size = None
+            elif line.startswith('Filename: '):
+                filename = line[10:].strip()  # 去掉 "Filename: " 前缀
+            elif line.startswith('Size: '):
+                try:
+                    size = int(line[6:])  # 去掉 "Size: " 前缀
+                except ValueError:
+                    pass
+    # 处理最后一个包信息块
+    if filename and size is not None and filename.endswith('.deb'):
+        sizes[filename] = size
+    return sizes
+
+
 def get_packages_file_sizes():
     """从现有的 Packages 文件中获取文件大小信息"""
     global _packages_file_sizes_cache
@@ -43,32 +154,21 @@ def get_packages_file_sizes():
               "Packages file not found, will download all files", file=sys.stderr)
         return _packages_file_sizes_cache
     
+    # Packages 文件未变化时直接使用磁盘缓存
+    packages_stat = os.stat(packages_file)
+    packages_key = {'mtime_ns': packages_stat.st_mtime_ns, 'size': packages_stat.st_size}
+    cached = load_dist_cache().get('packages')
+    if cached and cached.get('key') == packages_key:
+        _packages_file_sizes_cache = cached['sizes']
+        print(Style.DIM + Fore.CYAN +
+              f"Loaded size info for {len(_packages_file_sizes_cache)} files from cache", file=sys.stderr)
+        return _packages_file_sizes_cache
+
     try:
-        with open(packages_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 分割每个包的信息块
-        package_blocks = content.split('\n\n')
-        
-        for block in package_blocks:
-            if not block.strip():
-                continue
-            
-            filename = None
-            size = None
-            
-            for line in block.strip().split('\n'):
-                if line.startswith('Filename: '):
-                    filename = line[10:].strip()  # 去掉 "Filename: " 前缀
-                elif line.startswith('Size: '):
-                    try:
-                        size = int(line[6:].strip())  # 去掉 "Size: " 前缀
-                    except ValueError:
-                        continue
-            
-            if filename and size is not None and filename.endswith('.deb'):
-                _packages_file_sizes_cache[filename] = size
-        
+        _packages_file_sizes_cache = (parse_packages_sizes_fast(packages_file) or
+                                      parse_packages_sizes(packages_file))
+        update_dist_cache('packages', {'key': packages_key, 'sizes': _packages_file_sizes_cache})
+
         print(Style.DIM + Fore.CYAN + 
               f"Loaded size info for {len(_packages_file_sizes_cache)} files from Packages file", file=sys.stderr)
         
@@ -89,14 +189,31 @@ def get_git_file_list():
         return _git_file_exists_cache
     
     try:
-        # 使用 git ls-tree 但不带 -l 参数，只获取文件名列表
-        result = subprocess.run(['git', 'ls-tree', '-r', '--name-only', 'HEAD', 'downloads/'], 
-                               capture_output=True, text=True, check=True)
+        # git ls-files 读取的是索引，因此以索引文件的修改时间和大小作为缓存键，
+        # 索引未变化时直接使用磁盘缓存，无需启动任何 git 进程
+        try:
+            index_stat = os.stat(GIT_INDEX_FILE)
+            index_key = {'mtime_ns': index_stat.st_mtime_ns, 'size': index_stat.st_size}
+        except OSError:
+            index_key = None
+        cached = load_dist_cache().get('git')
+        if index_key and cached and cached.get('key') == index_key:
+            _git_file_exists_cache = set(cached['files'])
+            print(Style.DIM + Fore.CYAN +
+                  f"Found {len(_git_file_exists_cache)} deb files in git repository (cached)", file=sys.stderr)
+            return _git_file_exists_cache
+
+        # 使用 git ls-files 直接读取索引获取文件名列表，无需遍历树对象
+        result = subprocess.run(['git', 'ls-files', '--', 'downloads/'],
+                               capture_output=True, text=True, check=True,
+                               env={**os.environ, 'GIT_OPTIONAL_LOCKS': '0'})
         
         for line in result.stdout.strip().split('\n'):
             if line.strip() and line.endswith('.deb'):
                 _git_file_exists_cache.add(line.strip())
-        
+        if index_key:
+            update_dist_cache('git', {'key': index_key, 'files': sorted(_git_file_exists_cache)})
+
         print(Style.DIM + Fore.CYAN + 
               f"Found {len(_git_file_exists_cache)} deb files in git repository", file=sys.stderr)
         
@@ -106,45 +223,134 @@ def get_git_file_list():
     
     return _git_file_exists_cache
 
+def get_git_packages_sizes():
+    """合并 git 文件列表和 Packages 大小信息，得到 {路径: 大小} 映射，只构建一次"""
+    global _git_packages_sizes_cache
+    if _git_packages_sizes_cache is None:
+        # 多个下载线程可能同时首次调用，加锁保证只有一个线程读取 Packages 文件和 git
+        with _git_packages_sizes_lock:
+            if _git_packages_sizes_cache is None:
+                packages_sizes = get_packages_file_sizes()
+                _git_packages_sizes_cache = {
+                    file_path: packages_sizes.get(file_path) for file_path in get_git_file_list()
+                }
+    return _git_packages_sizes_cache
+
+
 def check_file_in_git(file_path, expected_size):
     """综合检查：文件必须存在于 git 中，且 Packages 文件中的大小匹配"""
-    # 首先检查文件是否存在于 git 仓库中
-    git_files = get_git_file_list()
-    if file_path not in git_files:
+    # Packages 文件中没有记录大小的文件（值为 None）只要求存在于 git 中
+    actual_size = get_git_packages_sizes().get(file_path, _MISSING)
+    if actual_size is _MISSING:
         return False
-    
-    # 然后检查 Packages 文件中记录的大小是否匹配
-    packages_sizes = get_packages_file_sizes()
-    actual_size = packages_sizes.get(file_path)
     return actual_size is None or actual_size == expected_size
 
 
 # 从 index.yaml 文件中读取仓库列表
 repos = []
 with open('index.yaml', 'r', encoding='utf-8') as file:
-    data = yaml.safe_load(file)
+    data = yaml.load(file, Loader=YamlLoader)
     repos = data['repos']
 
 
+SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB']
+PROGRESS_BAR_WIDTH = 80
+PROGRESS_BAR_TEMPLATE = '=' * PROGRESS_BAR_WIDTH + ' ' * PROGRESS_BAR_WIDTH
+PROGRESS_UPDATE_INTERVAL = 0.2
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+def pick_size_unit(size):
+    """选择适合显示给定大小的单位，返回单位和对应的除数"""
+    divisor = 1
+    for unit in SIZE_UNITS[:-1]:
+        if size < divisor * 1024:
+            return unit, divisor
+        divisor *= 1024
+    return SIZE_UNITS[-1], divisor
+
+
+def _get_download_etags():
+    """读取未完成下载的 ETag 记录，调用方需持有 _download_etags_lock"""
+    global _download_etags_cache
+    if _download_etags_cache is None:
+        _download_etags_cache = load_json(ETAG_CACHE_FILE)
+    return _download_etags_cache
+
+
+def get_download_etag(url):
+    """返回某个 URL 未完成下载时记录的 ETag"""
+    # 下载线程会同时首次访问，加锁保证 ETag 记录只加载一次
+    with _download_etags_lock:
+        return _get_download_etags().get(url)
+
+
+def set_download_etag(url, etag):
+    """更新或移除某个 URL 的 ETag 记录，并原子地写回磁盘"""
+    with _download_etags_lock:
+        etags = _get_download_etags()
+        if etag is None:
+            if etags.pop(url, None) is None:
+                return
+        else:
+            etags[url] = etag
+        save_json_atomic(ETAG_CACHE_FILE, etags, indent=2)
+
+
 def format_size(size):
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024:
-            return f"{size:.2f} {unit}"
-        size /= 1024
-    return f"{size:.2f} TB"
+    unit, divisor = pick_size_unit(size)
+    return f"{size / divisor:.2f} {unit}"
+
+
+def get_content_range_total(response):
+    """从 206 响应的 Content-Range 头中取出完整文件大小，无法解析时返回 None"""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+def write_response_body(r, local_filename, file_size, show_progress):
+    """把响应体写入本地文件，file_size 大于 0 时追加到已有内容之后，返回文件的最终大小"""
+    total_size = int(r.headers.get('Content-Length', 0)) + file_size
+    mode = 'ab' if file_size > 0 else 'wb'
+    # 每个文件只选择一次显示单位；进度条只在格数变化或距上次刷新超过 0.2 秒时重绘
+    unit, divisor = pick_size_unit(total_size)
+    total_label = f"{total_size / divisor:.2f} {unit}"
+    last_update = 0
+    last_done = -1
+    # 使用默认的缓冲写入：1 MiB 的块会直接写入文件，且 BufferedWriter 会重试直到整块写完，
+    # 不会像原始 FileIO 那样在部分写入时悄悄丢失数据
+    with open(local_filename, mode) as f:
+        downloaded = file_size
+        # 直接从底层连接按 1 MiB 读取，避免 iter_content 的逐块迭代开销
+        r.raw.decode_content = True
+        while chunk := r.raw.read(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            downloaded += len(chunk)
+            if not show_progress:
+                continue
+            done = int(PROGRESS_BAR_WIDTH * downloaded / total_size) if total_size else 0
+            now = time.monotonic()
+            if done == last_done and now - last_update < PROGRESS_UPDATE_INTERVAL:
+                continue
+            last_update = now
+            last_done = done
+            bar = PROGRESS_BAR_TEMPLATE[PROGRESS_BAR_WIDTH - done:2 * PROGRESS_BAR_WIDTH - done]
+            sys.stdout.write(
+                f"\r[{bar}] {downloaded / divisor:.2f} {unit} / {total_label}")
+            sys.stdout.flush()
+    if show_progress:
+        print()  # 换行
+    else:
+        print(Fore.GREEN +
+              f"Downloaded {local_filename} ({format_size(downloaded)})", file=sys.stderr)
+    return downloaded
 
 
-def download_file(url, dest_folder, asset_size=0, sparse_checkout=False):
-    if not os.path.exists(dest_folder):
-        os.makedirs(dest_folder)
+def download_file(url, dest_folder, asset_size=0, sparse_checkout=False, show_progress=True):
+    # 输出不是终端（如 CI 日志）时不绘制进度条
+    show_progress = show_progress and sys.stdout.isatty()
     local_filename = os.path.join(dest_folder, url.split('/')[-1])
 
-    if asset_size == 0:
-        # 使用 HEAD 请求检查文件大小
-        head_response = requests.head(url, timeout=30)
-        head_response.raise_for_status()
-        asset_size = int(head_response.headers.get('Content-Length', 0))
-
     # 在 sparse-checkout 模式下，使用 git 检查文件
     if SPARSE_CHECKOUT and sparse_checkout:
         if check_file_in_git(local_filename, asset_size):
@@ -163,93 +369,279 @@ def download_file(url, dest_folder, asset_size=0, sparse_checkout=False):
                 print(Style.DIM + Fore.YELLOW +
                       f"{local_filename} already exists, skipping download.", file=sys.stderr)
                 return local_filename
-            # 如果文件大小不一致，删除文件
-            os.remove(local_filename)
-            print(Fore.YELLOW +
-                  f"File {local_filename} already exists, but size mismatch, redownloading.",
-                  file=sys.stderr)
-            file_size = 0
+            if file_size < asset_size:
+                # 本地文件比服务器上的小，视为上次中断的下载，从断点处继续
+                print(Fore.YELLOW +
+                      f"File {local_filename} is incomplete, resuming download.", file=sys.stderr)
+            else:
+                # 如果文件大小不一致且无法续传，删除文件
+                os.remove(local_filename)
+                print(Fore.YELLOW +
+                      f"File {local_filename} already exists, but size mismatch, redownloading.",
+                      file=sys.stderr)
+                file_size = 0
         else:
             file_size = 0
 
-    with requests.get(url, stream=True, timeout=120) as r:
+    headers = {}
+    if file_size > 0:
+        headers['Range'] = f'bytes={file_size}-'
+        # 有强 ETag 时附带 If-Range，服务器上的文件变化时会返回 200 和完整内容
+        etag = get_download_etag(url)
+        if etag:
+            headers['If-Range'] = etag
+
+    # 信号量只限制同时发起的请求数，响应头返回后即释放，不在传输响应体期间占用
+    with host_semaphore(url):
+        r = SESSION.get(url, headers=headers, stream=True, timeout=120)
+    with r:
         r.raise_for_status()
-        total_size = int(r.headers.get('Content-Length', 0)) + file_size
-        mode = 'ab' if file_size > 0 else 'wb'
-        with open(local_filename, mode) as f:
-            downloaded = file_size
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-                done = int(80 * downloaded / total_size)
-                sys.stdout.write(
-                    f"\r[{'=' * done}{' ' * (80-done)}] {format_size(downloaded)} / {format_size(total_size)}")
-                sys.stdout.flush()
-        print()  # 换行
+        if file_size > 0 and r.status_code != 206:
+            print(Fore.YELLOW +
+                  f"{local_filename} changed on server, redownloading.", file=sys.stderr)
+            file_size = 0
+        elif file_size > 0 and get_content_range_total(r) != asset_size:
+            # 没有 ETag 可供 If-Range 校验时，至少确认续传的是同样大小的文件，
+            # 否则丢弃这个部分响应，删除本地文件后重新完整下载
+            file_size = -1
+        if file_size >= 0:
+            # 记录强 ETag，以便下载中断后可以安全地续传
+            etag = r.headers.get('ETag')
+            if file_size == 0:
+                set_download_etag(url, etag if etag and not etag.startswith('W/') else None)
+            write_response_body(r, local_filename, file_size, show_progress)
+
+    if file_size < 0:
+        print(Fore.YELLOW +
+              f"{local_filename} changed on server, redownloading.", file=sys.stderr)
+        os.remove(local_filename)
+        set_download_etag(url, None)
+        return download_file(url, dest_folder, asset_size, sparse_checkout, show_progress)
+
+    # 下载完成后不再需要续传
+    set_download_etag(url, None)
 
     return local_filename
 
 
+def load_manifest_validators(validators_file):
+    """读取清单文件上次下载时记录的 ETag 和 Last-Modified"""
+    return load_json(validators_file)
+
+
 def download_repo_manifests(repo_url):
     repo_host = repo_url.split('/')[2]
     manifests_url = f'{repo_url}/Packages.gz'
+    dest_folder = f'.cache/{repo_host}'
+    os.makedirs(dest_folder, exist_ok=True)
+    local_filename = os.path.join(dest_folder, 'Packages.gz')
+    validators_file = f'{local_filename}.etag'
     print(Fore.CYAN +
           f"[{repo_url}] Downloading {manifests_url}...", file=sys.stderr)
-    download_file(manifests_url, f'.cache/{repo_host}')
+
+    # 本地已有清单时发送条件请求，未变化时服务器返回 304，不再重复下载
+    headers = {}
+    if os.path.exists(local_filename):
+        validators = load_manifest_validators(validators_file)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    with host_semaphore(manifests_url):
+        r = SESSION.get(manifests_url, headers=headers, stream=True, timeout=120)
+    with r:
+        if r.status_code == 304:
+            print(Style.DIM + Fore.YELLOW +
+                  f"{local_filename} not modified, skipping download.", file=sys.stderr)
+            return local_filename
+        r.raise_for_status()
+        # 先删除旧的记录，避免下载中断后下次运行误把不完整的文件当作未变化
+        if os.path.exists(validators_file):
+            os.remove(validators_file)
+        # 清单与 release 列表获取和 deb 下载同时进行，不显示进度条以免相互覆盖
+        write_response_body(r, local_filename, 0, show_progress=False)
+        validators = {
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+        }
+
+    if validators['etag'] or validators['last_modified']:
+        save_json_atomic(validators_file, validators)
+    return local_filename
 
 
 def repo_name_from_url(repo_url):
     return '/'.join(repo_url.split('/')[-2:])
 
 
-def fetch_releases_from_repo(repo_url):
-    repo_name = repo_name_from_url(repo_url)
-    releases_url = f'https://api.github.com/repos/{repo_name}/releases'
-    print(Fore.CYAN +
-          f"[{repo_name}] Fetching release metadata...", file=sys.stderr)
-    response = requests.get(releases_url, headers={
+def get_release_cache_file(repo_name):
+    return os.path.join(RELEASE_CACHE_DIR, repo_name.replace('/', '_') + '.json')
+
+
+def load_release_cache(repo_name):
+    """读取某个仓库的 release 列表缓存，格式为 {URL: {etag, body}}"""
+    return load_json(get_release_cache_file(repo_name))
+
+
+def save_release_cache(repo_name, release_cache):
+    """原子地写回某个仓库的 release 列表缓存"""
+    save_json_atomic(get_release_cache_file(repo_name), release_cache)
+
+
+def fetch_release_page(repo_name, page_url, release_cache):
+    """获取一页 release 列表，返回该页内容和下一页的 URL"""
+    headers = {
         'Authorization': f'token {GITHUB_TOKEN}',
         'Accept': 'application/vnd.github.v3+json'
-    }, params={'per_page': GITHUB_RELEASES_PER_PAGE}, timeout=30)
+    }
+    # release 列表未变化时 GitHub 返回 304，直接复用上次缓存的内容
+    cached = release_cache.get(page_url)
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    with host_semaphore(page_url):
+        response = SESSION.get(page_url, headers=headers, timeout=30)
+    if response.status_code == 304 and cached:
+        print(Style.DIM + Fore.CYAN +
+              f"[{repo_name}] Release metadata not modified, using cache", file=sys.stderr)
+        return cached['body'], cached.get('next')
     response.raise_for_status()
-    return repo_url, repo_name, response.json()
-
+    releases = response.json()
+    next_url = response.links.get('next', {}).get('url')
+    etag = response.headers.get('ETag')
+    if etag:
+        release_cache[page_url] = {'etag': etag, 'body': releases, 'next': next_url}
+    return releases, next_url
 
-def fetch_releases_from_repos(repo_urls):
-    releases_by_repo = {}
-    if not repo_urls:
-        return releases_by_repo
 
-    max_workers = min(GITHUB_RELEASE_FETCH_WORKERS, len(repo_urls))
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_repo = {
-            executor.submit(fetch_releases_from_repo, repo_url): repo_url
-            for repo_url in repo_urls
-        }
-        for future in as_completed(future_to_repo):
-            repo_url, repo_name, releases = future.result()
-            releases_by_repo[repo_url] = (repo_name, releases)
+def fetch_releases_from_repo(repo_url):
+    repo_name = repo_name_from_url(repo_url)
+    page_url = f'https://api.github.com/repos/{repo_name}/releases?per_page={GITHUB_RELEASES_PER_PAGE}'
+    print(Fore.CYAN +
+          f"[{repo_name}] Fetching release metadata...", file=sys.stderr)
+    release_cache = load_release_cache(repo_name)
+    releases = []
+    fetched_urls = []
+    # 按 Link 头中的 rel="next" 翻页，最多获取 GITHUB_RELEASES_MAX_PAGES 页
+    for _ in range(GITHUB_RELEASES_MAX_PAGES):
+        fetched_urls.append(page_url)
+        page, page_url = fetch_release_page(repo_name, page_url, release_cache)
+        releases.extend(page)
+        if not page_url:
+            break
+    # 只保留本次访问过的页面，避免缓存中堆积过期的分页
+    save_release_cache(repo_name, {url: release_cache[url] for url in fetched_urls if url in release_cache})
+    return repo_url, repo_name, releases
+
+
+def hash_deb_file(file_path, stat_key):
+    """在工作进程中计算 deb 文件哈希，返回哈希缓存条目"""
+    return file_path, {**stat_key, 'hashes': get_file_hashes(file_path)}
+
+
+def submit_deb_hash(hash_executor, hash_cache, file_path):
+    """将下载完成的 deb 文件提交到进程池计算哈希，已缓存或不存在的文件直接跳过"""
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    stat_key = {'mtime_ns': stat_result.st_mtime_ns, 'size': stat_result.st_size}
+    entry = hash_cache.get(file_path)
+    if entry and all(entry.get(k) == v for k, v in stat_key.items()):
+        return None
+    return hash_executor.submit(hash_deb_file, file_path, stat_key)
+
+
+def is_asset_synced(local_filename, asset_size):
+    """判断 deb 文件是否已同步：sparse-checkout 模式下检查 git，否则检查本地文件大小"""
+    if SPARSE_CHECKOUT:
+        return check_file_in_git(local_filename, asset_size)
+    try:
+        return os.path.getsize(local_filename) == asset_size
+    except OSError:
+        return False
 
-    return releases_by_repo
 
+def submit_deb_downloads(download_executor, repo_name, releases, on_downloaded=None):
+    """把某个仓库 release 中的 deb 文件提交到共享的下载线程池，返回对应的 Future 列表"""
+    assets = [
+        asset
+        for release in releases
+        for asset in release['assets']
+        if asset['name'].endswith('.deb')
+    ]
+
+    # 多个下载同时进行时进度条会相互覆盖，只在单线程下载时显示
+    show_progress = DOWNLOAD_WORKERS <= 1
+
+    def download_asset(asset):
+        print(Fore.CYAN +
+              f"[{repo_name}] Downloading {asset['name']}...", file=sys.stderr)
+        local_filename = download_file(asset['browser_download_url'], 'downloads',
+                                       asset_size=asset['size'], sparse_checkout=True,
+                                       show_progress=show_progress)
+        if on_downloaded:
+            on_downloaded(local_filename)
+
+    # 提交前先过滤掉已经同步好的文件，这些文件不再进入下载队列
+    pending = []
+    for asset in assets:
+        local_filename = os.path.join('downloads', asset['browser_download_url'].split('/')[-1])
+        if is_asset_synced(local_filename, asset['size']):
+            # 已有的文件同样交给回调，以便补齐哈希缓存
+            if on_downloaded:
+                on_downloaded(local_filename)
+        else:
+            pending.append(asset)
+    if len(pending) < len(assets):
+        print(Style.DIM + Fore.YELLOW +
+              f"[{repo_name}] Skipping {len(assets) - len(pending)} already-synced assets", file=sys.stderr)
 
-def download_deb_files_from_releases(repo_name, releases):
-    for release in releases:
-        for asset in release['assets']:
-            if asset['name'].endswith('.deb'):
-                print(Fore.CYAN +
-                      f"[{repo_name}] Downloading {asset['name']}...", file=sys.stderr)
-                download_file(asset['browser_download_url'],
-                              'downloads', asset_size=asset['size'], sparse_checkout=True)
+    return [download_executor.submit(download_asset, asset) for asset in pending]
 
 
 def main():
-    download_repo_manifests('https://havoc.app')
-    releases_by_repo = fetch_releases_from_repos(repos)
-    for repo in repos:
-        repo_name, releases = releases_by_repo[repo]
-        download_deb_files_from_releases(repo_name, releases)
+    # 启动时一次性创建下载目录和缓存目录，下载线程中不再逐个检查
+    os.makedirs('downloads', exist_ok=True)
+    os.makedirs(RELEASE_CACHE_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(ETAG_CACHE_FILE), exist_ok=True)
+
+    # 下载完成的 deb 文件立即在进程池中计算哈希，与后续下载重叠进行，
+    # 结果写入哈希缓存供 build_packages.py 直接复用
+    hash_cache = load_hash_cache()
+    hash_futures = []
+    # 清单下载、release 列表获取和 deb 下载分别在各自的线程池中重叠进行：
+    # 某个仓库的 release 列表一返回，就把它的 deb 文件加入共享的下载队列
+    # 哈希进程在下载线程运行期间才会启动，使用 spawn 而不是 fork，
+    # 避免子进程继承其他线程持有的 SSL、套接字和输出锁而死锁
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as hash_executor, \
+            ThreadPoolExecutor(max_workers=max(1, DOWNLOAD_WORKERS)) as download_executor, \
+            ThreadPoolExecutor(max_workers=GITHUB_RELEASE_FETCH_WORKERS) as fetch_executor:
+        def on_downloaded(local_filename):
+            future = submit_deb_hash(hash_executor, hash_cache, local_filename)
+            if future:
+                hash_futures.append(future)
+
+        manifest_future = fetch_executor.submit(download_repo_manifests, 'https://havoc.app')
+        release_futures = [fetch_executor.submit(fetch_releases_from_repo, repo_url) for repo_url in repos]
+        download_futures = []
+        for future in as_completed(release_futures):
+            _, repo_name, releases = future.result()
+            download_futures.extend(
+                submit_deb_downloads(download_executor, repo_name, releases, on_downloaded))
+
+        manifest_future.result()
+        for future in download_futures:
+            future.result()
+
+        for future in hash_futures:
+            file_path, entry = future.result()
+            hash_cache[file_path] = entry
+
+    if hash_futures:
+        save_hash_cache(hash_cache)
+        print(Style.DIM + Fore.CYAN +
+              f"Cached hashes for {len(hash_futures)} deb files", file=sys.stderr)
 
     print(Fore.GREEN + "Operation completed successfully.", file=sys.stderr)
 
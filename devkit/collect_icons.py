@@ -1,75 +1,116 @@
 #!/usr/bin/env python3
 
-import re
-import subprocess
 import gzip
 import os
+import shutil
 import sys
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 from colorama import init, Fore
+from http_session import create_session
 
 # 初始化 colorama
 init(autoreset=True)
 
+# 优先使用 libyaml 提供的 C 实现解析 YAML
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# 所有图标请求共用一个会话，复用到 havoc.app 等主机的 keep-alive 连接
+SESSION = create_session()
+
+# 并发下载图标的线程数，图标请求都很小，主要耗时在网络往返上
+ICON_DOWNLOAD_WORKERS = 16
+# 写入图标文件时每次复制的字节数
+ICON_COPY_BUFFER_SIZE = 64 * 1024
+
 # 从 index.yaml 文件中读取 Havoc ID 映射
 havoc_ids = {}
 with open('index.yaml', 'r', encoding='utf-8') as file:
-    data = yaml.safe_load(file)
+    data = yaml.load(file, Loader=YamlLoader)
     havoc_ids = data['havoc-mappings']
 
 existing_icon_mappings = {}
 try:
     with open('icons/index.yaml', 'r', encoding='utf-8') as file:
-        existing_icon_mappings = yaml.safe_load(file) or {}
+        existing_icon_mappings = yaml.load(file, Loader=YamlLoader) or {}
 except FileNotFoundError:
     pass
 
 
+def _version_order(c):
+    # Debian 规则：'~' 排在最前（甚至早于空串），字母次之，其余符号排在字母之后
+    if c == '~':
+        return -1
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+
+def _compare_version_part(a, b):
+    i = j = 0
+    while i < len(a) or j < len(b):
+        # 先比较非数字部分
+        first_diff = 0
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ac = _version_order(a[i]) if i < len(a) and not a[i].isdigit() else 0
+            bc = _version_order(b[j]) if j < len(b) and not b[j].isdigit() else 0
+            if ac != bc:
+                return ac - bc
+            i += 1
+            j += 1
+        # 再比较数字部分
+        while i < len(a) and a[i] == '0':
+            i += 1
+        while j < len(b) and b[j] == '0':
+            j += 1
+        while i < len(a) and a[i].isdigit() and j < len(b) and b[j].isdigit():
+            if not first_diff:
+                first_diff = ord(a[i]) - ord(b[j])
+            i += 1
+            j += 1
+        if i < len(a) and a[i].isdigit():
+            return 1
+        if j < len(b) and b[j].isdigit():
+            return -1
+        if first_diff:
+            return first_diff
+    return 0
+
+
+def _split_version(ver):
+    epoch, _, rest = ver.partition(':') if ':' in ver else ('0', '', ver)
+    upstream, _, revision = rest.rpartition('-') if '-' in rest else (rest, '', '')
+    return int(epoch) if epoch.isdigit() else 0, upstream, revision
+
+
 def compare_version_gt(ver1, ver2):
-    result = subprocess.run(
-        ['dpkg', '--compare-versions', ver1, 'gt', ver2], capture_output=True, check=False)
-    return result.returncode == 0
+    # 进程内实现 dpkg --compare-versions 的排序规则，避免每次比较都启动 dpkg
+    epoch1, upstream1, revision1 = _split_version(ver1)
+    epoch2, upstream2, revision2 = _split_version(ver2)
+    if epoch1 != epoch2:
+        return epoch1 > epoch2
+    result = _compare_version_part(upstream1, upstream2)
+    if result == 0:
+        result = _compare_version_part(revision1, revision2)
+    return result > 0
 
 
-def main():
-    havoc_control_list = {}
-    with gzip.open('.cache/havoc.app/Packages.gz', 'rt') as f:
-        control_content = f.read()
-        control_list = control_content.split('\n\n')
-        havoc_versions = {}
-        for control in control_list:
-            package_name = re.search(r"^Package: (.+)$", control, re.MULTILINE)
-            package_version = re.search(
-                r"^Version: (.+)$", control, re.MULTILINE)
-            if not package_name or not package_version:
-                continue
-            if package_name.group(1) not in havoc_ids.keys():
-                continue
-            previous_version = havoc_versions.get(package_name.group(1), None)
-            if previous_version and compare_version_gt(previous_version, package_version.group(1)):
-                continue
-            havoc_versions[package_name.group(1)] = package_version.group(1)
-            havoc_control_list[package_name.group(1)] = control
-    havoc_icons = {}
-    for package_name, control in havoc_control_list.items():
-        icon_url = re.search(r"^Icon: (.+)$", control, re.MULTILINE)
-        if package_name and icon_url:
-            havoc_icons[package_name] = icon_url.group(1)
-    print(f'Found {len(havoc_icons)} icons.', file=sys.stderr)
-    for key, url in havoc_icons.items():
-        existing_icon_name = existing_icon_mappings.get(key)
-        expected_prefix = url.split("/")[-1] + "."
-        if (existing_icon_name and existing_icon_name.startswith(expected_prefix) and
-                os.path.exists(f'icons/{existing_icon_name}')):
-            havoc_icons[key] = existing_icon_name
-            print(Fore.YELLOW +
-                  f'icons/{existing_icon_name} already exists, skipping download.',
-                  file=sys.stderr)
-            continue
+def fetch_icon(key, url):
+    existing_icon_name = existing_icon_mappings.get(key)
+    expected_prefix = url.split("/")[-1] + "."
+    if (existing_icon_name and existing_icon_name.startswith(expected_prefix) and
+            os.path.exists(f'icons/{existing_icon_name}')):
+        print(Fore.YELLOW +
+              f'icons/{existing_icon_name} already exists, skipping download.',
+              file=sys.stderr)
+        return existing_icon_name
 
-        print(Fore.CYAN + f'Downloading {url}...', file=sys.stderr)
-        response = requests.get(url, timeout=30)
+    print(Fore.CYAN + f'Downloading {url}...', file=sys.stderr)
+    # 流式读取响应体直接写入磁盘，不在内存中保留整张图片
+    with SESSION.get(url, stream=True, timeout=30) as response:
         response.raise_for_status()
         suffix = ''
         content_type = response.headers.get('Content-Type', '').split(';', 1)[0].lower()
@@ -80,14 +121,80 @@ def main():
         else:
             print(Fore.YELLOW + f'Unsupported image format: {response.headers.get("Content-Type", "")}',
                   file=sys.stderr)
-            continue
+            return None
         icon_name = url.split("/")[-1] + suffix
-        os.makedirs('icons', exist_ok=True)
-        with open(f'icons/{icon_name}', 'wb') as f:
-            f.write(response.content)
-        havoc_icons[key] = icon_name
-        print(Fore.GREEN +
-              f'Saved to icons/{icon_name}', file=sys.stderr)
+        # 让 urllib3 按 Content-Encoding 解压，与 response.content 的行为保持一致
+        response.raw.decode_content = True
+        # 先写入临时文件，完整下载后再替换，避免中途失败留下截断的图标
+        temp_file = f'icons/{icon_name}.tmp'
+        try:
+            with open(temp_file, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, ICON_COPY_BUFFER_SIZE)
+        except BaseException:
+            # 读取超时或连接重置时删除临时文件，不在 icons 目录中留下残留
+            os.unlink(temp_file)
+            raise
+        os.replace(temp_file, f'icons/{icon_name}')
+    print(Fore.GREEN +
+          f'Saved to icons/{icon_name}', file=sys.stderr)
+    return icon_name
+
+
+def main():
+    # 逐行流式解析 Packages.gz，每个包信息块只记录 Package、Version 和 Icon 字段
+    havoc_versions = {}
+    havoc_icon_urls = {}
+
+    def finish_block(block):
+        package_name = block.get('Package')
+        package_version = block.get('Version')
+        if not package_name or not package_version:
+            return
+        if package_name not in havoc_ids:
+            return
+        previous_version = havoc_versions.get(package_name, None)
+        if previous_version and compare_version_gt(previous_version, package_version):
+            return
+        havoc_versions[package_name] = package_version
+        havoc_icon_urls[package_name] = block.get('Icon')
+
+    with gzip.open('.cache/havoc.app/Packages.gz', 'rt') as f:
+        block = {}
+        skipping = False
+        for line in f:
+            if line == '\n':
+                if not skipping:
+                    finish_block(block)
+                block = {}
+                skipping = False
+            elif skipping:
+                # 不在 havoc_ids 中的包，跳过该信息块的其余行
+                continue
+            elif line.startswith('Package: '):
+                package_name = line[9:].rstrip('\n')
+                if 'Package' not in block and package_name not in havoc_ids:
+                    skipping = True
+                    continue
+                block.setdefault('Package', package_name)
+            elif line.startswith('Version: '):
+                block.setdefault('Version', line[9:].rstrip('\n'))
+            elif line.startswith('Icon: '):
+                block.setdefault('Icon', line[6:].rstrip('\n'))
+        if not skipping:
+            finish_block(block)
+
+    havoc_icons = {
+        package_name: icon_url
+        for package_name, icon_url in havoc_icon_urls.items()
+        if icon_url
+    }
+    print(f'Found {len(havoc_icons)} icons.', file=sys.stderr)
+    os.makedirs('icons', exist_ok=True)
+    jobs = list(havoc_icons.items())
+    with ThreadPoolExecutor(max_workers=ICON_DOWNLOAD_WORKERS) as executor:
+        for (key, _), icon_name in zip(jobs, executor.map(lambda job: fetch_icon(*job), jobs)):
+            if icon_name:
+                havoc_icons[key] = icon_name
     if havoc_icons == existing_icon_mappings:
         print(Fore.GREEN + 'No icon changes.', file=sys.stderr)
         return
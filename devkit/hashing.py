@@ -0,0 +1,92 @@
+# build_packages.py、build_release.py 和 collect_dists.py 共用的文件哈希计算、deb 文件哈希缓存和 JSON 缓存读写
+
+import os
+import json
+import hashlib
+
+
+# Packages 文件中的哈希字段名及对应的 hashlib 算法
+HASH_ALGORITHMS = [
+    ('MD5sum', 'md5'),
+    ('SHA1', 'sha1'),
+    ('SHA256', 'sha256'),
+    ('SHA512', 'sha512'),
+]
+HASH_BLOCK_SIZE = 1 << 20
+
+# deb 文件哈希缓存，以文件路径、修改时间和大小作为键
+HASH_CACHE_FILE = '.cache/deb-hashes.json'
+
+# Packages 及其压缩文件的哈希，由 build_packages.py 在压缩时顺带计算，供 build_release.py 使用；
+# 格式为 {路径: {mtime_ns, size, hashes: {hashlib 算法名: 十六进制摘要}}}
+PACKAGES_HASHES_FILE = '.cache/packages-hashes.json'
+
+
+def get_file_hashes(file_path, hash_algorithms=HASH_ALGORITHMS):
+    """分块读取文件，一次遍历同时计算所有哈希，返回以字段名为键的字典"""
+    hash_objs = {name: hashlib.new(algorithm) for name, algorithm in hash_algorithms}
+    # 与 hashlib.file_digest 相同，复用同一块缓冲区，避免每块分配新的 bytes 对象
+    buffer = bytearray(HASH_BLOCK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while size := f.readinto(buffer):
+            for hash_obj in hash_objs.values():
+                hash_obj.update(view[:size])
+    return {name: hash_obj.hexdigest() for name, hash_obj in hash_objs.items()}
+
+
+def load_json(path):
+    """读取 JSON 缓存文件，文件不存在或内容损坏时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_json_atomic(path, obj, indent=None):
+    """先写入临时文件再替换，保证读取方不会看到写了一半的 JSON"""
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=indent, sort_keys=True)
+    os.replace(temp_file, path)
+
+
+def load_hash_cache():
+    """读取 deb 文件哈希缓存"""
+    return load_json(HASH_CACHE_FILE)
+
+
+def save_hash_cache(hash_cache):
+    """原子地写入 deb 文件哈希缓存，并移除已不存在的文件"""
+    hash_cache = {path: entry for path, entry in hash_cache.items() if os.path.exists(path)}
+    os.makedirs(os.path.dirname(HASH_CACHE_FILE), exist_ok=True)
+    save_json_atomic(HASH_CACHE_FILE, hash_cache, indent=2)
+
+
+def save_packages_hashes(file_hashes):
+    """记录 Packages 及其压缩文件的哈希，file_hashes 的值以 hashlib 算法名为键"""
+    packages_hashes = {}
+    for file_path, hashes in file_hashes.items():
+        stat_result = os.stat(file_path)
+        packages_hashes[file_path] = {
+            'mtime_ns': stat_result.st_mtime_ns,
+            'size': stat_result.st_size,
+            'hashes': hashes,
+        }
+    os.makedirs(os.path.dirname(PACKAGES_HASHES_FILE), exist_ok=True)
+    save_json_atomic(PACKAGES_HASHES_FILE, packages_hashes, indent=2)
+
+
+def load_packages_hashes():
+    """读取 build_packages.py 记录的哈希"""
+    return load_json(PACKAGES_HASHES_FILE)
+
+
+def get_recorded_hashes(packages_hashes, file_path, stat_result):
+    """文件修改时间和大小与记录一致时返回记录的哈希（以 hashlib 算法名为键），否则返回 None"""
+    entry = packages_hashes.get(str(file_path))
+    if (entry and entry.get('mtime_ns') == stat_result.st_mtime_ns and
+            entry.get('size') == stat_result.st_size):
+        return entry['hashes']
+    return None
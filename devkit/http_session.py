@@ -0,0 +1,17 @@
+# collect_dists.py 和 collect_icons.py 共用的 HTTP 会话配置
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session():
+    """创建带连接池和自动重试的会话，复用 keep-alive 连接，避免每个请求重新进行 TCP/TLS 握手"""
+    session = requests.Session()
+    http_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                               max_retries=Retry(total=5, backoff_factor=0.3,
+                                                 status_forcelist=[429, 500, 502, 503, 504],
+                                                 raise_on_status=False))
+    session.mount('https://', http_adapter)
+    session.mount('http://', http_adapter)
+    return session